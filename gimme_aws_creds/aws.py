@@ -11,7 +11,6 @@ See the License for the specific language governing permissions and* limitations
 """
 import base64
 import json
-import xml.etree.ElementTree as ET
 
 import requests
 from bs4 import BeautifulSoup
@@ -19,7 +18,7 @@ from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
 import gimme_aws_creds.common as commondef
-from . import errors
+from .saml import SamlAssertion
 
 
 class AwsResolver(object):
@@ -58,30 +57,16 @@ class AwsResolver(object):
         return response.text
 
     def _enumerate_saml_roles(self, assertion, saml_target_url):
-        signin_page = self.get_signinpage(assertion, saml_target_url)
-        
-        """ using the assertion to fetch aws sign-in page, parse it and return aws sts creds """
-        role_pairs = []
-        root = ET.fromstring(base64.b64decode(assertion))
-        for saml2_attribute in root.iter('{urn:oasis:names:tc:SAML:2.0:assertion}Attribute'):
-            if saml2_attribute.get('Name') == 'https://aws.amazon.com/SAML/Attributes/Role':
-                for saml2_attribute_value in saml2_attribute.iter('{urn:oasis:names:tc:SAML:2.0:assertion}AttributeValue'):
-                    role_pairs.append(saml2_attribute_value.text)
-
-        # build a temp hash table
-        table = {}
-        for role_pair in role_pairs:
-            idp, role = None, None
-            for field in role_pair.split(','):
-                if 'saml-provider' in field:
-                    idp = field
-                elif 'role' in field:
-                    role = field
-            if not idp or not role:
-                raise errors.GimmeAWSCredsError('Parsing error on {}'.format(role_pair))
-            else:
-                table[role] = idp
-        
+        """ using the assertion to fetch aws sign-in page, parse it and return aws sts creds
+
+        :type assertion: str | SamlAssertion
+        """
+        if not isinstance(assertion, SamlAssertion):
+            assertion = SamlAssertion(assertion, saml_target_url)
+
+        signin_page = self.get_signinpage(assertion.encoded, saml_target_url)
+        table = assertion.idp_table
+
         # init parser
         soup = BeautifulSoup(signin_page, 'html.parser')
         
@@ -0,0 +1,180 @@
+"""
+Copyright 2016-present Nike, Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+You may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+      http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and* limitations under the License.*
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import keyring
+from cryptography.fernet import Fernet, InvalidToken
+from keyring.backends.fail import Keyring as FailKeyring
+
+CACHE_DIR_ENV_VAR = 'GIMME_AWS_CREDS_CACHE_DIR'
+KEYRING_SERVICE = 'gimme-aws-creds'
+
+
+def get_cache_dir(gac_ui):
+    """
+    :type gac_ui: ui.UserInterface
+    :return: the directory holding gimme-aws-creds caches
+    """
+    return gac_ui.environ.get(CACHE_DIR_ENV_VAR, os.path.join(gac_ui.HOME, '.okta_aws_cache'))
+
+
+def cache_key(*parts):
+    """ builds a stable, opaque key out of identifying values (org, user, app, ...) """
+    return hashlib.sha256('\0'.join(str(part or '') for part in parts).encode('utf-8')).hexdigest()
+
+
+def get_encryption_key(name):
+    """ returns a Fernet key stored in the system keyring, creating it if necessary
+
+    :param name: name of the keyring entry
+    :return: the key, or None when no usable keyring is available
+    """
+    if isinstance(keyring.get_keyring(), FailKeyring):
+        return None
+    try:
+        key = keyring.get_password(KEYRING_SERVICE, name)
+        if not key:
+            key = Fernet.generate_key().decode('ascii')
+            keyring.set_password(KEYRING_SERVICE, name, key)
+    except Exception:
+        return None
+    return key
+
+
+class FileCache(object):
+    """
+       A small JSON document of expiring entries, stored in the cache directory.
+
+       The file is read once per instance and rewritten atomically on every change,
+       so concurrent gimme-aws-creds processes never see a partially written file.
+       Instances are safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.RLock()
+        self._entries = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None or self._is_expired(entry):
+                return default
+            return self._decode(entry['value'])
+
+    def set(self, key, value, ttl=None, expires=None):
+        """
+        :param ttl: lifetime of the entry in seconds
+        :param expires: absolute expiration of the entry (epoch seconds), overrides ttl
+        """
+        if expires is None and ttl is not None:
+            expires = time.time() + ttl
+        with self._lock:
+            self._load()[key] = {'expires': expires, 'value': self._encode(value)}
+            self._save()
+
+    def update(self, values, ttl=None):
+        """ sets several entries with a single write """
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            entries = self._load()
+            for key, value in values.items():
+                entries[key] = {'expires': expires, 'value': self._encode(value)}
+            self._save()
+
+    def items(self):
+        with self._lock:
+            return [(key, self._decode(entry['value']))
+                    for key, entry in self._load().items() if not self._is_expired(entry)]
+
+    def delete(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            if os.path.exists(self._path):
+                os.remove(self._path)
+
+    def _encode(self, value):
+        return value
+
+    def _decode(self, value):
+        return value
+
+    @staticmethod
+    def _is_expired(entry):
+        return entry.get('expires') is not None and entry['expires'] <= time.time()
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self._path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            if not isinstance(entries, dict):
+                entries = {}
+            self._entries = {key: entry for key, entry in entries.items()
+                             if isinstance(entry, dict) and not self._is_expired(entry)}
+        return self._entries
+
+    def _save(self):
+        directory = os.path.dirname(self._path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, mode=0o700)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class EncryptedFileCache(FileCache):
+    """
+       A FileCache whose values are encrypted with a key that never touches the disk.
+       Entries that can't be decrypted (e.g. the key was rotated) are treated as missing.
+    """
+
+    def __init__(self, path, key):
+        super().__init__(path)
+        self._fernet = Fernet(key)
+
+    def get(self, key, default=None):
+        try:
+            return super().get(key, default)
+        except InvalidToken:
+            self.delete(key)
+            return default
+
+    def _encode(self, value):
+        return self._fernet.encrypt(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    def _decode(self, value):
+        return json.loads(self._fernet.decrypt(value.encode('ascii')).decode('utf-8'))
@@ -273,6 +273,7 @@ class Config(object):
             'okta_username': '',
             'app_url': '',
             'resolve_aws_alias': 'n',
+            'cache_saml_assertion': 'n',
             'include_path': 'n',
             'preferred_mfa_type': '',
             'remember_device': 'n',
@@ -326,6 +327,7 @@ class Config(object):
         config_dict['include_path'] = self._get_include_path(defaults['include_path'])
         config_dict['aws_rolename'] = self._get_aws_rolename(defaults['aws_rolename'])
         config_dict['resolve_aws_alias'] = self._get_resolve_aws_alias(defaults['resolve_aws_alias'])
+        config_dict['cache_saml_assertion'] = self._get_cache_saml_assertion(defaults['cache_saml_assertion'])
         config_dict['aws_default_duration'] = self._get_aws_default_duration(defaults['aws_default_duration'])
         if config_dict['gimme_creds_server'] != 'appurl':
             config_dict['aws_appname'] = self._get_aws_appname(defaults['aws_appname'])
@@ -507,6 +509,18 @@ class Config(object):
             except ValueError:
                 ui.default.warning("Resolve AWS alias must be either y or n.")
 
+    def _get_cache_saml_assertion(self, default_entry):
+        """ Option to reuse the SAML assertion until it expires """
+        ui.default.message(
+            "Do you want to cache the SAML assertion, encrypted with a key kept in the system keyring,\n"
+            "and reuse it without logging in again until it expires?"
+            "\nPlease answer y or n.")
+        while True:
+            try:
+                return self._get_user_input_yes_no("Cache SAML assertion", default_entry)
+            except ValueError:
+                ui.default.warning("Cache SAML assertion must be either y or n.")
+
     def _get_cred_profile(self, default_entry):
         """sets the aws credential profile name"""
         ui.default.message(
@@ -9,11 +9,7 @@ distributed under the License is distributed on an "AS IS" BASIS,
 WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and* limitations under the License.*
 """
-import base64
-import xml.etree.ElementTree as ET
-
-import gimme_aws_creds.common as commondef
-from . import errors
+from .saml import SamlAssertion
 
 
 class DefaultResolver(object):
@@ -26,29 +22,13 @@ class DefaultResolver(object):
         return
 
     def _enumerate_saml_roles(self, assertion, saml_target_url):
-        """ using the assertion to fetch aws sign-in page, parse it and return aws sts creds """
-        role_pairs = []
-        root = ET.fromstring(base64.b64decode(assertion))
-        for saml2_attribute in root.iter('{urn:oasis:names:tc:SAML:2.0:assertion}Attribute'):
-            if saml2_attribute.get('Name') == 'https://aws.amazon.com/SAML/Attributes/Role':
-                for saml2_attribute_value in saml2_attribute.iter('{urn:oasis:names:tc:SAML:2.0:assertion}AttributeValue'):
-                    role_pairs.append(saml2_attribute_value.text)
-
-        # Normalize pieces of string; order may vary per AWS sample
-        result = []
-        for role_pair in role_pairs:
-            idp, role = None, None
-            for field in role_pair.split(','):
-                if 'saml-provider' in field:
-                    idp = field
-                elif 'role' in field:
-                    role = field
-            if not idp or not role:
-                raise errors.GimmeAWSCredsError('Parsing error on {}'.format(role_pair))
-            else:
-                result.append(commondef.RoleSet(idp=idp, role=role, friendly_account_name="", friendly_role_name=""))
+        """ return the roles in the assertion, without friendly names
 
-        return result
+        :type assertion: str | SamlAssertion
+        """
+        if not isinstance(assertion, SamlAssertion):
+            assertion = SamlAssertion(assertion, saml_target_url)
+        return assertion.roles
 
     def _display_role(self, roles):
         """ gets a list of available roles and
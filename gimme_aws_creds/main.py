@@ -30,11 +30,13 @@ from okta.errors.error import Error as OktaError
 # local imports
 from . import errors, ui, version
 from .aws import AwsResolver
+from .cache import EncryptedFileCache, cache_key, get_cache_dir, get_encryption_key
 from .config import Config
 from .default import DefaultResolver
 from .okta_identity_engine import OktaIdentityEngine
 from .okta_classic import OktaClassicClient
 from .registered_authenticators import RegisteredAuthenticators
+from .saml import SamlAssertion, get_partition_and_region_from_saml_acs
 
 
 class GimmeAWSCreds(object):
@@ -59,6 +61,9 @@ class GimmeAWSCreds(object):
         'AWS_STS_REGION'
     ]
 
+    # STS errors meaning the SAML assertion itself is no longer accepted
+    REJECTED_ASSERTION_ERROR_CODES = ('ExpiredTokenException', 'InvalidIdentityToken')
+
     envvar_conf_map = {
         'GIMME_AWS_CREDS_CLIENT_ID': 'client_id',
         'GIMME_AWS_CREDS_CRED_PROFILE': 'cred_profile',
@@ -163,26 +168,7 @@ class GimmeAWSCreds(object):
     @staticmethod
     def _get_partition_and_region_from_saml_acs(saml_acs_url):
         """ Determine the AWS partition and region by looking at the ACS endpoint URL. """
-        if saml_acs_url.endswith('signin.aws.amazon.com/saml'):
-            match = re.search(r"https:\/\/(.*)\.signin\.aws\.amazon\.com\/saml", saml_acs_url)
-            if match is None:
-                return('aws', 'us-east-1')
-            else:
-                return ('aws', match.group(1))
-        elif saml_acs_url.endswith('signin.amazonaws.cn/saml'):
-            match = re.search(r"https:\/\/(.*)\.signin\.amazonaws\.cn\/saml", saml_acs_url)
-            if match is None:
-                return('aws-cn', 'cn-north-1')
-            else:
-                return ('aws-cn', match.group(1))
-        elif saml_acs_url.endswith('signin.amazonaws-us-gov.com/saml'):
-            match = re.search(r"https:\/\/(.*)\.signin\.amazonaws-us-gov\.com\/saml", saml_acs_url)
-            if match is None:
-                return('aws-us-gov', 'us-gov-east-1')
-            else:
-                return ('aws-us-gov', match.group(1))
-        else:
-            raise errors.GimmeAWSCredsError("{} is an unknown ACS URL".format(saml_acs_url))
+        return get_partition_and_region_from_saml_acs(saml_acs_url)
 
     @staticmethod
     def _get_sts_creds(partition, region, assertion, idp, role, duration=3600):
@@ -704,18 +690,86 @@ class GimmeAWSCreds(object):
 
     @property
     def saml_data(self):
-        if 'saml_data' in self._cache:
+        if 'saml_data' in self._cache or self._load_cached_saml_data():
             return self._cache['saml_data']
         self._cache['saml_data'] = saml_data = self.okta.get_saml_response(self.aws_app['links']['appLink'], self.auth_session)
+        self._store_saml_data(saml_data)
         return saml_data
 
+    @property
+    def saml_cache(self):
+        """ the opt-in, encrypted SAML assertion cache, or None when it is disabled or unavailable """
+        if 'saml_cache' in self._cache:
+            return self._cache['saml_cache']
+        saml_cache = None
+        if str(self.conf_dict.get('cache_saml_assertion')).lower() in ('true', 'y', 'yes'):
+            key = get_encryption_key('saml-assertion-cache')
+            if key is None:
+                self.ui.warning('No usable system keyring found, SAML assertions will not be cached.')
+            else:
+                saml_cache = EncryptedFileCache(os.path.join(get_cache_dir(self.ui), 'saml_assertions'), key)
+        self._cache['saml_cache'] = saml_cache
+        return saml_cache
+
+    @property
+    def saml_cache_key(self):
+        """ identifies the org, user and app of an assertion, None if the user or app isn't known before login """
+        if self.conf_dict.get('gimme_creds_server') == 'appurl':
+            app = self.conf_dict.get('app_url')
+        else:
+            app = self.conf_dict.get('aws_appname')
+        username = self.config.username or self.conf_dict.get('okta_username')
+        if not app or not username:
+            return None
+        return cache_key(self.okta_org_url, username, app)
+
+    def _load_cached_saml_data(self):
+        """ reuses a SAML assertion from a previous run while AWS still accepts it """
+        if self._cache.get('saml_data_cached'):
+            return True
+        if self.saml_cache is None or self.saml_cache_key is None:
+            return False
+
+        saml_data = self.saml_cache.get(self.saml_cache_key)
+        if saml_data is None:
+            return False
+
+        saml_assertion = SamlAssertion.from_saml_data(saml_data)
+        if saml_assertion.is_expired():
+            self.saml_cache.delete(self.saml_cache_key)
+            return False
+
+        self._cache['saml_data'] = saml_data
+        self._cache['saml_assertion'] = saml_assertion
+        self._cache['saml_data_cached'] = True
+        self.ui.info('Using cached SAML assertion, valid until {}'.format(saml_assertion.not_on_or_after.isoformat()))
+        return True
+
+    def _store_saml_data(self, saml_data):
+        if self.saml_cache is None or self.saml_cache_key is None:
+            return
+        saml_assertion = self.saml_assertion
+        if saml_assertion.not_on_or_after is None or saml_assertion.is_expired():
+            return
+        self.saml_cache.set(self.saml_cache_key, saml_data, expires=saml_assertion.not_on_or_after.timestamp() - 30)
+
+    @property
+    def saml_assertion(self):
+        """
+        :rtype: SamlAssertion
+        """
+        if 'saml_assertion' in self._cache:
+            return self._cache['saml_assertion']
+        self._cache['saml_assertion'] = saml_assertion = SamlAssertion.from_saml_data(self.saml_data)
+        return saml_assertion
+
     @property
     def aws_roles(self):
         if 'aws_roles' in self._cache:
             return self._cache['aws_roles']
 
         self._cache['aws_roles'] = roles = self.resolver._enumerate_saml_roles(
-            self.saml_data['SAMLResponse'],
+            self.saml_assertion,
             self.saml_data['TargetUrl'],
         )
         return roles
@@ -743,7 +797,7 @@ class GimmeAWSCreds(object):
     def aws_partition(self):
         if 'aws_partition' in self._cache:
             return self._cache['aws_partition']
-        aws_partition, aws_region = self._get_partition_and_region_from_saml_acs(self.saml_data['TargetUrl'])
+        aws_partition, aws_region = self.saml_assertion.partition, self.saml_assertion.region
         self._cache['aws_partition'] = aws_partition
         # use the region of the SAML ACS if one wasn't specified by the user
         if self.conf_dict.get('aws_region') is None:
@@ -753,14 +807,16 @@ class GimmeAWSCreds(object):
     def prepare_data(self, role, generate_credentials=False):
         aws_creds = {}
         if generate_credentials:
+            # Don't ask STS for more than the IdP allows, it would only fail
+            duration = self.saml_assertion.cap_duration(self.config.aws_default_duration)
             try:
                 aws_creds = self._get_sts_creds(
                     self.aws_partition,
                     self.conf_dict.get('aws_region'),
-                    self.saml_data['SAMLResponse'],
+                    self.saml_assertion.encoded,
                     role.idp,
                     role.role,
-                    self.config.aws_default_duration,
+                    duration,
                 )
             except ClientError as ex:
                 if 'requested DurationSeconds exceeds the MaxSessionDuration' in ex.response['Error']['Message']:
@@ -769,13 +825,17 @@ class GimmeAWSCreds(object):
                     aws_creds = self._get_sts_creds(
                         self.aws_partition,
                         self.conf_dict.get('aws_region'),
-                        self.saml_data['SAMLResponse'],
+                        self.saml_assertion.encoded,
                         role.idp,
                         role.role,
                         3600,
                     )
                 else:
                     self.ui.error('Failed to generate credentials for {} due to {}'.format(role.role, ex))
+                    if self._cache.get('saml_data_cached') and \
+                            ex.response['Error'].get('Code') in self.REJECTED_ASSERTION_ERROR_CODES:
+                        # Don't hand out a rejected assertion again, the next run will log in
+                        self.saml_cache.delete(self.saml_cache_key)
 
         naming_data = self._parse_role_arn(role.role)
         # set the profile name
@@ -862,9 +922,12 @@ class GimmeAWSCreds(object):
         """ Pulling it all together to make the CLI """
         self.handle_action_configure()
         self.handle_action_list_profiles()
-        if self.okta_platform == 'classic':
-            self.handle_action_register_device()
-            self.handle_setup_fido_authenticator()
+        # A cached SAML assertion means this run doesn't need to talk to Okta at all
+        if self.config.action_register_device or self.config.action_setup_fido_authenticator \
+                or not self._load_cached_saml_data():
+            if self.okta_platform == 'classic':
+                self.handle_action_register_device()
+                self.handle_setup_fido_authenticator()
         self.handle_action_store_json_creds()
         self.handle_action_list_roles()
 
@@ -0,0 +1,163 @@
+"""
+Copyright 2016-present Nike, Inc.
+Licensed under the Apache License, Version 2.0 (the "License");
+You may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+      http://www.apache.org/licenses/LICENSE-2.0
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and* limitations under the License.*
+"""
+import base64
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+import gimme_aws_creds.common as commondef
+from . import errors
+
+SAML2_ASSERTION_NS = '{urn:oasis:names:tc:SAML:2.0:assertion}'
+ROLE_ATTRIBUTE = 'https://aws.amazon.com/SAML/Attributes/Role'
+SESSION_DURATION_ATTRIBUTE = 'https://aws.amazon.com/SAML/Attributes/SessionDuration'
+# The shortest DurationSeconds AssumeRoleWithSAML accepts
+MIN_SESSION_DURATION = 900
+
+
+def get_partition_and_region_from_saml_acs(saml_acs_url):
+    """ Determine the AWS partition and region by looking at the ACS endpoint URL. """
+    if saml_acs_url.endswith('signin.aws.amazon.com/saml'):
+        match = re.search(r"https:\/\/(.*)\.signin\.aws\.amazon\.com\/saml", saml_acs_url)
+        if match is None:
+            return ('aws', 'us-east-1')
+        else:
+            return ('aws', match.group(1))
+    elif saml_acs_url.endswith('signin.amazonaws.cn/saml'):
+        match = re.search(r"https:\/\/(.*)\.signin\.amazonaws\.cn\/saml", saml_acs_url)
+        if match is None:
+            return ('aws-cn', 'cn-north-1')
+        else:
+            return ('aws-cn', match.group(1))
+    elif saml_acs_url.endswith('signin.amazonaws-us-gov.com/saml'):
+        match = re.search(r"https:\/\/(.*)\.signin\.amazonaws-us-gov\.com\/saml", saml_acs_url)
+        if match is None:
+            return ('aws-us-gov', 'us-gov-east-1')
+        else:
+            return ('aws-us-gov', match.group(1))
+    else:
+        raise errors.GimmeAWSCredsError("{} is an unknown ACS URL".format(saml_acs_url))
+
+
+def _parse_saml_datetime(value):
+    """ SAML timestamps are xs:dateTime in UTC, e.g. 2018-03-14T22:23:41.839Z """
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = datetime.strptime(value.split('.')[0].split('+')[0], '%Y-%m-%dT%H:%M:%S')
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class SamlAssertion(object):
+    """
+       A SAML response from Okta, decoded and parsed once.
+
+       Exposes everything gimme-aws-creds needs from the assertion: the role/IdP pairs,
+       the SessionDuration attribute, the NotOnOrAfter validity limit, the subject and
+       the partition/region of the ACS endpoint it is meant for.
+    """
+
+    def __init__(self, encoded, target_url=None):
+        """
+        :param encoded: the base64 encoded SAMLResponse, as posted to AWS
+        :param target_url: the SAML ACS url (form action) the response is meant for
+        """
+        self.encoded = encoded
+        self.target_url = target_url
+
+        self.role_pairs = []
+        self.session_duration = None
+        self.not_on_or_after = None
+        self.subject = None
+
+        self._parse(ET.fromstring(base64.b64decode(encoded)))
+
+    @classmethod
+    def from_saml_data(cls, saml_data):
+        """ builds the assertion from the dict returned by get_saml_response """
+        return cls(saml_data['SAMLResponse'], saml_data.get('TargetUrl'))
+
+    def _parse(self, root):
+        not_on_or_after = []
+        for element in root.iter():
+            if element.tag == SAML2_ASSERTION_NS + 'Attribute':
+                name = element.get('Name')
+                if name == ROLE_ATTRIBUTE:
+                    for value in element.iter(SAML2_ASSERTION_NS + 'AttributeValue'):
+                        self.role_pairs.append(self._parse_role_pair(value.text))
+                elif name == SESSION_DURATION_ATTRIBUTE:
+                    for value in element.iter(SAML2_ASSERTION_NS + 'AttributeValue'):
+                        try:
+                            self.session_duration = int(value.text.strip())
+                        except (AttributeError, ValueError):
+                            pass
+            elif element.tag == SAML2_ASSERTION_NS + 'NameID' and self.subject is None:
+                self.subject = element.text
+            elif element.tag in (SAML2_ASSERTION_NS + 'Conditions', SAML2_ASSERTION_NS + 'SubjectConfirmationData'):
+                if element.get('NotOnOrAfter'):
+                    not_on_or_after.append(_parse_saml_datetime(element.get('NotOnOrAfter')))
+
+        if not_on_or_after:
+            self.not_on_or_after = min(not_on_or_after)
+
+    @staticmethod
+    def _parse_role_pair(role_pair):
+        # Normalize pieces of string; order may vary per AWS sample
+        idp, role = None, None
+        for field in (role_pair or '').split(','):
+            if 'saml-provider' in field:
+                idp = field
+            elif 'role' in field:
+                role = field
+        if not idp or not role:
+            raise errors.GimmeAWSCredsError('Parsing error on {}'.format(role_pair))
+        return idp, role
+
+    @property
+    def roles(self):
+        """ the roles in the assertion, without friendly names """
+        return [
+            commondef.RoleSet(idp=idp, role=role, friendly_account_name="", friendly_role_name="")
+            for idp, role in self.role_pairs
+        ]
+
+    @property
+    def idp_table(self):
+        """ role arn -> saml provider arn """
+        return {role: idp for idp, role in self.role_pairs}
+
+    @property
+    def partition(self):
+        return get_partition_and_region_from_saml_acs(self.target_url)[0]
+
+    @property
+    def region(self):
+        return get_partition_and_region_from_saml_acs(self.target_url)[1]
+
+    def cap_duration(self, duration):
+        """ caps the requested session duration to the SessionDuration attribute, if the IdP sent one.
+        STS never accepts less than MIN_SESSION_DURATION seconds, so the cap doesn't go below it. """
+        if self.session_duration is None:
+            return duration
+        return min(duration, max(self.session_duration, MIN_SESSION_DURATION))
+
+    def is_expired(self, now=None, skew=30):
+        """ True when AWS will no longer accept this assertion (allowing for clock skew, in seconds) """
+        if self.not_on_or_after is None:
+            return False
+        now = now or datetime.now(timezone.utc)
+        return (self.not_on_or_after - now).total_seconds() <= skew
@@ -0,0 +1,86 @@
+"""Unit tests for gimme_aws_creds.cache"""
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from cryptography.fernet import Fernet
+
+from gimme_aws_creds.cache import EncryptedFileCache, FileCache, cache_key, get_cache_dir
+from tests.user_interface_mock import MockUserInterface
+
+
+class TestFileCache(unittest.TestCase):
+    """Class to test the FileCache Class."""
+
+    def setUp(self):
+        """Set up for the unit tests"""
+        self.path = os.path.join(tempfile.mkdtemp(), 'cache', 'entries')
+
+    def test_get_missing(self):
+        cache = FileCache(self.path)
+        self.assertIsNone(cache.get('nope'))
+        self.assertEqual(cache.get('nope', 'default'), 'default')
+
+    def test_set_persists(self):
+        FileCache(self.path).set('key', {'a': 1})
+        self.assertEqual(FileCache(self.path).get('key'), {'a': 1})
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_expired_entries(self):
+        cache = FileCache(self.path)
+        cache.set('old', 'value', expires=time.time() - 1)
+        cache.set('new', 'value', ttl=60)
+        self.assertIsNone(cache.get('old'))
+        self.assertEqual(FileCache(self.path).items(), [('new', 'value')])
+
+    def test_delete_and_clear(self):
+        cache = FileCache(self.path)
+        cache.update({'a': 1, 'b': 2})
+        cache.delete('a')
+        self.assertIsNone(FileCache(self.path).get('a'))
+        self.assertEqual(FileCache(self.path).get('b'), 2)
+        cache.clear()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_corrupt_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('not json')
+        self.assertIsNone(FileCache(self.path).get('key'))
+
+
+class TestEncryptedFileCache(unittest.TestCase):
+    """Class to test the EncryptedFileCache Class."""
+
+    def setUp(self):
+        """Set up for the unit tests"""
+        self.path = os.path.join(tempfile.mkdtemp(), 'secrets')
+        self.key = Fernet.generate_key()
+
+    def test_round_trip(self):
+        EncryptedFileCache(self.path, self.key).set('key', {'SAMLResponse': 'secret'})
+        self.assertEqual(EncryptedFileCache(self.path, self.key).get('key'), {'SAMLResponse': 'secret'})
+
+        with open(self.path) as f:
+            self.assertNotIn('secret', json.dumps(json.load(f)))
+
+    def test_wrong_key(self):
+        EncryptedFileCache(self.path, self.key).set('key', 'value')
+        cache = EncryptedFileCache(self.path, Fernet.generate_key())
+        self.assertIsNone(cache.get('key'))
+
+
+class TestCacheHelpers(unittest.TestCase):
+    def test_cache_key(self):
+        self.assertEqual(cache_key('org', 'user', 'app'), cache_key('org', 'user', 'app'))
+        self.assertNotEqual(cache_key('org', 'user', 'app'), cache_key('org', 'user2', 'app'))
+        self.assertEqual(cache_key('org', None), cache_key('org', ''))
+
+    def test_get_cache_dir(self):
+        test_ui = MockUserInterface()
+        self.assertEqual(get_cache_dir(test_ui), os.path.join(test_ui.HOME, '.okta_aws_cache'))
+
+        test_ui = MockUserInterface(environ={'GIMME_AWS_CREDS_CACHE_DIR': '/tmp/gimme'})
+        self.assertEqual(get_cache_dir(test_ui), '/tmp/gimme')
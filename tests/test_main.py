@@ -1,9 +1,18 @@
+import datetime
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
 
+from cryptography.fernet import Fernet
+
 from gimme_aws_creds import errors
+from gimme_aws_creds.cache import EncryptedFileCache
 from gimme_aws_creds.common import RoleSet
+from gimme_aws_creds.config import Config
 from gimme_aws_creds.main import GimmeAWSCreds
+from tests import read_fixture
+from tests.user_interface_mock import MockUserInterface
 
 
 class TestMain(unittest.TestCase):
@@ -298,3 +307,133 @@ class TestMain(unittest.TestCase):
         include_path = True
         self.assertEqual(creds.get_profile_name(cred_profile, include_path, naming_data, resolve_alias, role),
                          'foo')
+
+    @patch('gimme_aws_creds.main.GimmeAWSCreds._get_sts_creds')
+    def test_prepare_data_caps_duration_to_saml_session_duration(self, mock_sts):
+        "The SessionDuration SAML attribute caps the requested duration"
+        creds = GimmeAWSCreds(ui=MockUserInterface())
+        creds._cache['config'] = config = Config(gac_ui=creds.ui, create_config=False)
+        config.aws_default_duration = 43200
+        creds._cache['conf_dict'] = {'cred_profile': 'role', 'resolve_aws_alias': False}
+        creds._cache['saml_data'] = {
+            'SAMLResponse': read_fixture('saml_assertion.txt').strip(),
+            'RelayState': '',
+            'TargetUrl': 'https://signin.aws.amazon.com/saml',
+        }
+        mock_sts.return_value = {
+            'AccessKeyId': 'AKIA', 'SecretAccessKey': 'secret', 'SessionToken': 'token',
+            'Expiration': datetime.datetime(2018, 3, 14, 23, 18, 41),
+        }
+        role = creds.saml_assertion.roles[0]
+
+        data = creds.prepare_data(role, generate_credentials=True)
+
+        mock_sts.assert_called_once_with('aws', 'us-east-1', creds.saml_assertion.encoded, role.idp, role.role, 3600)
+        self.assertEqual(data['profile']['name'], 'testrole3')
+        self.assertEqual(data['credentials']['aws_access_key_id'], 'AKIA')
+
+    def test_saml_data_from_cache_skips_okta(self):
+        "A cached, unexpired SAML assertion is reused without logging in to Okta"
+        creds = GimmeAWSCreds(ui=MockUserInterface())
+        creds._cache['config'] = Config(gac_ui=creds.ui, create_config=False)
+        creds._cache['conf_dict'] = {
+            'okta_org_url': 'https://example.okta.com',
+            'okta_username': 'ann',
+            'gimme_creds_server': 'appurl',
+            'app_url': 'https://example.okta.com/home/amazon_aws/0oa/272',
+        }
+        creds._cache['saml_cache'] = EncryptedFileCache(
+            os.path.join(tempfile.mkdtemp(), 'saml_assertions'), Fernet.generate_key())
+        saml_data = {
+            'SAMLResponse': read_fixture('saml_assertion.txt').strip(),
+            'RelayState': '',
+            'TargetUrl': 'https://signin.aws.amazon.com/saml',
+        }
+        creds.saml_cache.set(creds.saml_cache_key, saml_data, ttl=60)
+
+        with patch('gimme_aws_creds.saml.SamlAssertion.is_expired', return_value=False), \
+                patch('gimme_aws_creds.main.GimmeAWSCreds.okta') as mock_okta:
+            self.assertEqual(creds.saml_data, saml_data)
+            self.assertEqual(creds.aws_partition, 'aws')
+            mock_okta.get_saml_response.assert_not_called()
+
+    def test_saml_cache_key_requires_known_app(self):
+        "Without an app configured, the assertion can't be looked up before logging in"
+        creds = GimmeAWSCreds(ui=MockUserInterface())
+        creds._cache['config'] = Config(gac_ui=creds.ui, create_config=False)
+        creds._cache['conf_dict'] = {'okta_org_url': 'https://example.okta.com', 'gimme_creds_server': 'internal'}
+        self.assertIsNone(creds.saml_cache_key)
+
+        creds.conf_dict['aws_appname'] = 'AWS Prod'
+        self.assertIsNone(creds.saml_cache_key)
+
+        creds.conf_dict['okta_username'] = 'ann'
+        self.assertIsNotNone(creds.saml_cache_key)
+
+    def test_saml_cache_accepts_y(self):
+        "cache_saml_assertion is written as True by the wizard, but y is accepted too"
+        for value in ('y', 'True', True):
+            creds = GimmeAWSCreds(ui=MockUserInterface())
+            creds._cache['conf_dict'] = {'cache_saml_assertion': value}
+            with patch('gimme_aws_creds.main.get_encryption_key', return_value=Fernet.generate_key()):
+                self.assertIsNotNone(creds.saml_cache)
+
+        creds = GimmeAWSCreds(ui=MockUserInterface())
+        creds._cache['conf_dict'] = {'cache_saml_assertion': 'n'}
+        self.assertIsNone(creds.saml_cache)
+
+    def _creds_with_cached_saml_data(self):
+        creds = GimmeAWSCreds(ui=MockUserInterface())
+        creds._cache['config'] = Config(gac_ui=creds.ui, create_config=False)
+        creds._cache['conf_dict'] = {
+            'okta_org_url': 'https://example.okta.com',
+            'okta_username': 'ann',
+            'gimme_creds_server': 'appurl',
+            'app_url': 'https://example.okta.com/home/amazon_aws/0oa/272',
+            'aws_rolename': 'arn:aws:iam::987654321987:role/testrole3',
+            'cred_profile': 'role',
+            'resolve_aws_alias': False,
+            'write_aws_creds': False,
+            'output_format': 'json',
+        }
+        creds._cache['saml_cache'] = EncryptedFileCache(
+            os.path.join(tempfile.mkdtemp(), 'saml_assertions'), Fernet.generate_key())
+        creds.saml_cache.set(creds.saml_cache_key, {
+            'SAMLResponse': read_fixture('saml_assertion.txt').strip(),
+            'RelayState': '',
+            'TargetUrl': 'https://signin.aws.amazon.com/saml',
+        }, ttl=60)
+        return creds
+
+    @patch('gimme_aws_creds.main.GimmeAWSCreds._get_sts_creds')
+    def test_run_with_cached_saml_data_skips_okta(self, mock_sts):
+        "A run served from the SAML assertion cache never touches Okta"
+        creds = self._creds_with_cached_saml_data()
+        mock_sts.return_value = {
+            'AccessKeyId': 'AKIA', 'SecretAccessKey': 'secret', 'SessionToken': 'token',
+            'Expiration': datetime.datetime(2018, 3, 14, 23, 18, 41),
+        }
+
+        with patch('gimme_aws_creds.saml.SamlAssertion.is_expired', return_value=False), \
+                patch('gimme_aws_creds.main.GimmeAWSCreds.okta_platform') as mock_platform, \
+                patch('gimme_aws_creds.main.GimmeAWSCreds.auth_session') as mock_auth_session, \
+                patch.object(creds.ui, 'result') as mock_result:
+            creds._run()
+
+        self.assertEqual(mock_platform.mock_calls, [])
+        self.assertEqual(mock_auth_session.mock_calls, [])
+        mock_sts.assert_called_once()
+        self.assertIn('AKIA', mock_result.call_args[0][0])
+
+    def test_prepare_data_keeps_cached_saml_data_on_unrelated_errors(self):
+        "Only errors about the assertion itself evict it from the cache"
+        from botocore.exceptions import ClientError
+
+        for code, evicted in (('AccessDenied', False), ('ExpiredTokenException', True)):
+            creds = self._creds_with_cached_saml_data()
+            with patch('gimme_aws_creds.saml.SamlAssertion.is_expired', return_value=False):
+                self.assertTrue(creds._load_cached_saml_data())
+            error = ClientError({'Error': {'Code': code, 'Message': 'nope'}}, 'AssumeRoleWithSAML')
+            with patch('gimme_aws_creds.main.GimmeAWSCreds._get_sts_creds', side_effect=error):
+                creds.prepare_data(creds.saml_assertion.roles[0], generate_credentials=True)
+            self.assertEqual(creds.saml_cache.get(creds.saml_cache_key) is None, evicted)
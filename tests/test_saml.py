@@ -0,0 +1,78 @@
+"""Unit tests for gimme_aws_creds.saml"""
+import unittest
+from datetime import datetime, timezone
+
+from gimme_aws_creds import errors
+from gimme_aws_creds.common import RoleSet
+from gimme_aws_creds.saml import SamlAssertion
+from tests import read_fixture
+
+
+class TestSamlAssertion(unittest.TestCase):
+    """Class to test the SamlAssertion Class."""
+
+    def setUp(self):
+        """Set up for the unit tests"""
+        self.saml = read_fixture('saml_assertion.txt').strip()
+        self.assertion = SamlAssertion(self.saml, 'https://signin.aws.amazon.com/saml')
+
+    def test_role_pairs(self):
+        self.assertEqual(len(self.assertion.role_pairs), 5)
+        self.assertEqual(self.assertion.role_pairs[0], ('arn:aws:iam::987654321987:saml-provider/OKTA-IDP',
+                                                        'arn:aws:iam::987654321987:role/testrole3'))
+
+    def test_roles(self):
+        self.assertEqual(self.assertion.roles[3],
+                         RoleSet(idp='arn:aws:iam::012345678901:saml-provider/OKTA-IDP',
+                                 role='arn:aws:iam::012345678901:role/testrole1',
+                                 friendly_account_name='',
+                                 friendly_role_name=''))
+
+    def test_idp_table(self):
+        self.assertEqual(self.assertion.idp_table['arn:aws:iam::012345678901:role/testrole2'],
+                         'arn:aws:iam::012345678901:saml-provider/OKTA-IDP')
+
+    def test_attributes(self):
+        self.assertEqual(self.assertion.session_duration, 3600)
+        self.assertEqual(self.assertion.subject, 'john.doe@mycorp.com')
+        self.assertEqual(self.assertion.not_on_or_after,
+                         datetime(2018, 3, 14, 22, 23, 41, 839000, tzinfo=timezone.utc))
+
+    def test_partition_and_region(self):
+        self.assertEqual(self.assertion.partition, 'aws')
+        self.assertEqual(self.assertion.region, 'us-east-1')
+
+        assertion = SamlAssertion(self.saml, 'https://us-gov-east-2.signin.amazonaws-us-gov.com/saml')
+        self.assertEqual(assertion.partition, 'aws-us-gov')
+        self.assertEqual(assertion.region, 'us-gov-east-2')
+
+    def test_unknown_acs(self):
+        assertion = SamlAssertion(self.saml, 'https://signin.amazonaws-foo.com/saml')
+        self.assertRaises(errors.GimmeAWSCredsError, lambda: assertion.partition)
+
+    def test_cap_duration(self):
+        self.assertEqual(self.assertion.cap_duration(43200), 3600)
+        self.assertEqual(self.assertion.cap_duration(900), 900)
+
+    def test_cap_duration_never_below_sts_minimum(self):
+        self.assertion.session_duration = 300
+        self.assertEqual(self.assertion.cap_duration(3600), 900)
+        self.assertEqual(self.assertion.cap_duration(900), 900)
+
+        self.assertion.session_duration = None
+        self.assertEqual(self.assertion.cap_duration(43200), 43200)
+
+    def test_is_expired(self):
+        self.assertTrue(self.assertion.is_expired())
+        self.assertFalse(self.assertion.is_expired(now=datetime(2018, 3, 14, 22, 20, tzinfo=timezone.utc)))
+        self.assertTrue(self.assertion.is_expired(now=datetime(2018, 3, 14, 22, 23, 20, tzinfo=timezone.utc)))
+
+    def test_from_saml_data(self):
+        assertion = SamlAssertion.from_saml_data({
+            'SAMLResponse': self.saml,
+            'RelayState': '',
+            'TargetUrl': 'https://cn-northwest-1.signin.amazonaws.cn/saml',
+        })
+        self.assertEqual(assertion.encoded, self.saml)
+        self.assertEqual(assertion.partition, 'aws-cn')
+        self.assertEqual(assertion.region, 'cn-northwest-1')